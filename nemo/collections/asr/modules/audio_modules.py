@@ -12,9 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from contextlib import nullcontext
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
-import numpy as np
 import torch
 
 from nemo.collections.asr.losses.audio_losses import temporal_mean
@@ -27,7 +28,7 @@ from nemo.collections.asr.parts.submodules.multichannel_modules import (
     TransformAttendConcatenate,
     TransformAverageConcatenate,
 )
-from nemo.collections.asr.parts.utils.audio_utils import db2mag, wrap_to_pi
+from nemo.collections.asr.parts.utils.audio_utils import db2mag
 from nemo.core.classes import NeuralModule, typecheck
 from nemo.core.neural_types import FloatType, LengthsType, NeuralType, SpectrogramType
 from nemo.utils import logging
@@ -42,6 +43,92 @@ __all__ = [
 ]
 
 
+@torch.jit.script
+def _rms_across_channels(x: torch.Tensor) -> torch.Tensor:
+    """Calculate RMS of the magnitude across channels.
+
+    Uses a single pass over the complex-valued input, without
+    materializing the magnitude and the squared magnitude.
+
+    Args:
+        x: input tensor, shape (B, C, F, N)
+
+    Returns:
+        RMS across channels, shape (B, 1, F, N)
+    """
+    if x.is_complex():
+        power = x.real * x.real + x.imag * x.imag
+    else:
+        power = x * x
+    return torch.sqrt(torch.mean(power, dim=1, keepdim=True))
+
+
+@torch.jit.script
+def _normalize_l2(x: torch.Tensor, dim: int, eps: float) -> torch.Tensor:
+    """Normalize input to have a unit L2-norm across `dim`.
+
+    Scales the input with the reciprocal square root of the energy,
+    instead of calculating the norm and dividing by it.
+
+    Args:
+        x: input tensor
+        dim: dimension for normalization
+        eps: regularization of the norm, applied as `eps**2` on the energy
+
+    Returns:
+        Normalized input, same shape as `x`
+    """
+    if x.is_complex():
+        power = x.real * x.real + x.imag * x.imag
+    else:
+        power = x * x
+    return x * torch.rsqrt(torch.sum(power, dim=dim, keepdim=True) + eps * eps)
+
+
+@torch.jit.script
+def _masked_power(x: torch.Tensor, mask: Optional[torch.Tensor], mask_min: float, mask_max: float) -> torch.Tensor:
+    """Calculate power of the input signal, optionally
+    masking the magnitude using a thresholded mask.
+
+    Args:
+        x: complex-valued input signal, shape (B, C, F, N)
+        mask: optional mask, shape (B, 1, F, N) or (B, C, F, N)
+        mask_min: lower threshold for the mask
+        mask_max: upper threshold for the mask, not applied if infinite
+
+    Returns:
+        Power of the (masked) signal, shape (B, C, F, N)
+    """
+    # Power from real and imaginary parts, without a square root and squaring of the magnitude
+    power = x.real * x.real + x.imag * x.imag
+    if mask is not None:
+        # Masking the magnitude is equal to scaling the power with the squared mask
+        if mask_max < float('inf'):
+            mask = torch.clamp(mask, min=mask_min, max=mask_max)
+        else:
+            # Only the lower threshold can change the mask
+            mask = torch.clamp_min(mask, mask_min)
+        power = power * (mask * mask)
+    return power
+
+
+@lru_cache(maxsize=None)
+def _convtensor_permutation(num_channels: int, filter_length: int) -> torch.Tensor:
+    """Column permutation that reverses the order of filter taps
+    for each channel in a packed convolution tensor.
+
+    Args:
+        num_channels: number of channels
+        filter_length: length of the filter for each channel
+
+    Returns:
+        Index tensor, shape (num_channels * filter_length,)
+    """
+    return (
+        torch.arange(num_channels).unsqueeze(1) * filter_length + torch.arange(filter_length - 1, -1, -1)
+    ).flatten()
+
+
 class SpectrogramToMultichannelFeatures(NeuralModule):
     """Convert a complex-valued multi-channel spectrogram to
     multichannel features.
@@ -250,15 +337,19 @@ class SpectrogramToMultichannelFeatures(NeuralModule):
         Returns:
             num_feat_channels channels with num_feat features, shape (B, num_feat_channels, num_feat, N)
         """
+        if self.mag_reduction == 'abs_mean' or self.use_ipd:
+            # Channel average, shared between magnitude and IPD features
+            spec_mean = torch.mean(input, axis=1, keepdim=True)
+
         # Magnitude spectrum
         if self.mag_reduction is None:
             mag = torch.abs(input)
         elif self.mag_reduction == 'abs_mean':
-            mag = torch.abs(torch.mean(input, axis=1, keepdim=True))
+            mag = torch.abs(spec_mean)
         elif self.mag_reduction == 'mean_abs':
             mag = torch.mean(torch.abs(input), axis=1, keepdim=True)
         elif self.mag_reduction == 'rms':
-            mag = torch.sqrt(torch.mean(torch.abs(input) ** 2, axis=1, keepdim=True))
+            mag = _rms_across_channels(input)
         else:
             raise ValueError(f'Unexpected magnitude reduction {self.mag_reduction}')
 
@@ -275,10 +366,8 @@ class SpectrogramToMultichannelFeatures(NeuralModule):
 
         if self.use_ipd:
             # Calculate IPD relative to the average spec
-            spec_mean = torch.mean(input, axis=1, keepdim=True)  # channel average
-            ipd = torch.angle(input) - torch.angle(spec_mean)
-            # Modulo to [-pi, pi]
-            ipd = wrap_to_pi(ipd)
+            # Phase of the ratio is already in (-pi, pi], no need for wrapping
+            ipd = torch.angle(input * spec_mean.conj())
 
             if self.ipd_normalization == 'mean':
                 # normalize mean across channels and time steps
@@ -288,7 +377,11 @@ class SpectrogramToMultichannelFeatures(NeuralModule):
                 ipd = self.normalize_mean_var(input=ipd, input_length=input_length)
 
             # Concatenate to existing features
-            features = torch.cat([features.expand(ipd.shape), ipd], axis=2)
+            num_mag_features = features.size(2)
+            output = ipd.new_empty(ipd.size(0), ipd.size(1), num_mag_features + ipd.size(2), ipd.size(3))
+            output[:, :, :num_mag_features, :] = features
+            output[:, :, num_mag_features:, :] = ipd
+            features = output
 
         if self._num_channels is not None and features.size(1) != self._num_channels:
             raise RuntimeError(
@@ -323,6 +416,10 @@ class MaskEstimatorRNN(NeuralModule):
         rnn_type: Type of RNN, either `lstm` or `gru`. Default: `lstm`
         mag_reduction: Channel-wise reduction for magnitude features
         use_ipd: Use inter-channel phase difference (IPD) features
+        autocast_dtype: Optional, run projections and RNNs with autocast to `torch.float16` or `torch.bfloat16`.
+                        Features and the output nonlinearity are calculated in the input precision.
+                        Masks are in [0, 1], so they are not sensitive to the reduced mantissa precision.
+                        Default `None` keeps the precision of the surrounding context.
     """
 
     def __init__(
@@ -338,11 +435,16 @@ class MaskEstimatorRNN(NeuralModule):
         rnn_type: str = 'lstm',
         mag_reduction: str = 'rms',
         use_ipd: bool = None,
+        autocast_dtype: Optional[torch.dtype] = None,
     ):
         super().__init__()
         if num_hidden_features is None:
             num_hidden_features = num_features
 
+        if autocast_dtype not in [None, torch.float16, torch.bfloat16]:
+            raise ValueError(f'Unsupported autocast dtype {autocast_dtype}, expecting torch.float16 or torch.bfloat16')
+        self.autocast_dtype = autocast_dtype
+
         self.features = SpectrogramToMultichannelFeatures(
             num_subbands=num_subbands,
             num_input_channels=num_input_channels,
@@ -380,11 +482,31 @@ class MaskEstimatorRNN(NeuralModule):
         )
         self.norm = torch.nn.LayerNorm(num_features)
 
-        # Each output shares the RNN and has a separate projection
-        self.output_projections = torch.nn.ModuleList(
-            [torch.nn.Linear(in_features=num_features, out_features=num_subbands) for _ in range(num_outputs)]
-        )
-        self.output_nonlinearity = torch.nn.Sigmoid()
+        # Each output shares the RNN and has a separate projection.
+        # Projections for all outputs are stacked in a single layer.
+        self.num_outputs = num_outputs
+        self.num_subbands = num_subbands
+        self.output_projection = torch.nn.Linear(in_features=num_features, out_features=num_outputs * num_subbands)
+
+        # Support loading checkpoints with a separate layer for each output projection
+        self._register_load_state_dict_pre_hook(self._stack_output_projections_hook)
+
+    def _stack_output_projections_hook(self, state_dict: Dict[str, torch.Tensor], prefix: str, *args, **kwargs):
+        """Convert weights from per-output projection layers, i.e., `output_projections.{m}`,
+        to the stacked `output_projection` layer.
+
+        Args:
+            state_dict: state dict to be loaded, modified in place
+            prefix: prefix of this module in the state dict
+        """
+        legacy_prefix = prefix + 'output_projections.'
+        if not any(key.startswith(legacy_prefix) for key in state_dict):
+            return
+
+        for name in ['weight', 'bias']:
+            state_dict[prefix + 'output_projection.' + name] = torch.cat(
+                [state_dict.pop(f'{legacy_prefix}{m}.{name}') for m in range(self.num_outputs)], dim=0
+            )
 
     @property
     def input_types(self) -> Dict[str, NeuralType]:
@@ -419,51 +541,117 @@ class MaskEstimatorRNN(NeuralModule):
         input, _ = self.features(input=input, input_length=input_length)
         B, num_feature_channels, num_features, N = input.shape
 
-        # (B, num_feat_channels, num_feat, N) -> (B, N, num_feat_channels, num_feat)
-        input = input.permute(0, 3, 1, 2)
+        if self.autocast_dtype is None:
+            autocast_context = nullcontext()
+        else:
+            autocast_context = torch.autocast(device_type=input.device.type, dtype=self.autocast_dtype)
+
+        with autocast_context:
+            masks, output_length = self.estimate_masks(input=input, input_length=input_length)
 
-        # (B, N, num_feat_channels, num_feat) -> (B, N, num_feat_channels * num_features)
-        input = input.view(B, N, -1)
+        # Nonlinearity in full precision, in-place on the projection output
+        masks = masks.to(input.dtype).sigmoid_()
 
-        # Apply projection on num_feat
-        input = self.input_projection(input)
+        # Back to the original format, written once into the output layout
+        # (B, N, num_outputs * F) -> (B, num_outputs, F, N)
+        output = masks.view(B, N, self.num_outputs, self.num_subbands).permute(0, 2, 3, 1).contiguous()
 
-        # Apply RNN on the input sequence
+        if output_length is None:
+            # All examples have full length
+            output_length = input_length
+        else:
+            # Mask frames beyond output length, mask shape (B, 1, 1, N)
+            length_mask: torch.Tensor = make_seq_mask_like(
+                lengths=output_length, like=output, time_dim=-1, valid_ones=False
+            )
+            output.masked_fill_(length_mask, 0.0)
+
+        return output, output_length
+
+    def estimate_masks(
+        self, input: torch.Tensor, input_length: torch.Tensor
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        """Apply projections and RNNs on the input features.
+
+        Args:
+            input: input features, shape (B, num_feat_channels, num_feat, N)
+            input_length: Length of valid entries along the time dimension, shape (B,)
+
+        Returns:
+            Mask logits for all outputs, shape (B, N, num_outputs * F), and output length
+            with shape (B,). Output length is `None` if all examples have full length.
+        """
+        N = input.size(-1)
+
+        # Note: RNN weights are flattened when the module is moved or cast (`_apply`)
+        if torch.all(input_length == N):
+            # All examples have the full length, packing is not required
+            return self._estimate_masks_full_length(input), None
+
+        input = self._apply_input_projection(input)
+
+        # Apply RNN on the packed input sequence
         input_packed = torch.nn.utils.rnn.pack_padded_sequence(
             input, input_length.cpu(), batch_first=True, enforce_sorted=False
         ).to(input.device)
-        self.rnn.flatten_parameters()
         input_packed, _ = self.rnn(input_packed)
-        output, output_length = torch.nn.utils.rnn.pad_packed_sequence(input_packed, batch_first=True)
+        # Pad to the input length, which may be longer than the longest example in the batch
+        output, output_length = torch.nn.utils.rnn.pad_packed_sequence(input_packed, batch_first=True, total_length=N)
         output_length = output_length.to(input.device)
 
-        # Layer normalization and skip connection
-        output = self.norm(self.fc(output)) + input
+        masks = self._apply_output_projection(output=output, input=input)
 
-        # Create `num_outputs` masks
-        masks = []
-        for output_projection in self.output_projections:
-            # Output projection
-            mask = output_projection(output)
-            mask = self.output_nonlinearity(mask)
+        return masks, output_length
 
-            # Back to the original format
-            # (B, N, F) -> (B, F, N)
-            mask = mask.transpose(2, 1)
+    def _estimate_masks_full_length(self, input: torch.Tensor) -> torch.Tensor:
+        """Apply projections and RNNs on the input features, assuming
+        all examples in the batch have the full length.
 
-            # Append to the output
-            masks.append(mask)
+        Args:
+            input: input features, shape (B, num_feat_channels, num_feat, N)
 
-        # Stack along channel dimension to get (B, M, F, N)
-        masks = torch.stack(masks, axis=1)
+        Returns:
+            Mask logits for all outputs, shape (B, N, num_outputs * F)
+        """
+        input = self._apply_input_projection(input)
+        output, _ = self.rnn(input)
+        return self._apply_output_projection(output=output, input=input)
 
-        # Mask frames beyond output length
-        length_mask: torch.Tensor = make_seq_mask_like(
-            lengths=output_length, like=masks, time_dim=-1, valid_ones=False
-        )
-        masks = masks.masked_fill(length_mask, 0.0)
+    def _apply_input_projection(self, input: torch.Tensor) -> torch.Tensor:
+        """Apply projection on the input features.
 
-        return masks, output_length
+        Args:
+            input: input features, shape (B, num_feat_channels, num_feat, N)
+
+        Returns:
+            Projected features, shape (B, N, num_features)
+        """
+        B, _, _, N = input.shape
+
+        # (B, num_feat_channels, num_feat, N) -> (B, num_feat_channels * num_feat, N)
+        input = input.reshape(B, -1, N)
+
+        # Apply projection on num_feat_channels * num_feat
+        # Linear layer uses the transposed input directly, without making a permuted copy
+        # (B, num_feat_channels * num_feat, N) -> (B, N, num_features)
+        return self.input_projection(input.transpose(1, 2))
+
+    def _apply_output_projection(self, output: torch.Tensor, input: torch.Tensor) -> torch.Tensor:
+        """Apply normalization, skip connection and the output projection on the RNN output.
+
+        Args:
+            output: RNN output, shape (B, N, num_rnn_features)
+            input: RNN input, shape (B, N, num_features)
+
+        Returns:
+            Mask logits for all outputs, shape (B, N, num_outputs * F)
+        """
+        # Layer normalization and skip connection
+        output = self.norm(self.fc(output)) + input
+
+        # Create `num_outputs` masks using a single projection
+        # (B, N, num_features) -> (B, N, num_outputs * F)
+        return self.output_projection(output)
 
 
 class MaskEstimatorFlexChannels(NeuralModule):
@@ -632,9 +820,6 @@ class MaskEstimatorFlexChannels(NeuralModule):
             ]
         )
 
-        # Output nonlinearity
-        self.output_nonlinearity = torch.nn.Sigmoid()
-
     @property
     def input_types(self) -> Dict[str, NeuralType]:
         """Returns definitions of module output ports.
@@ -701,19 +886,20 @@ class MaskEstimatorFlexChannels(NeuralModule):
             # (B, M, F, T) -> (B, F, T)
             output = self.channel_reduction(input=output)
 
-        # final mask for each output
-        masks = []
-        for output_layer in self.output_layers:
-            # calculate mask
+        # final mask for each output, written directly into the output tensor
+        masks = None
+        for m, output_layer in enumerate(self.output_layers):
+            # calculate mask logits
             with typecheck.disable_checks():
                 # output is AcousticEncodedRepresentation, conformer encoder requires SpectrogramType
                 mask, mask_length = output_layer(audio_signal=output, length=output_length)
-            mask = self.output_nonlinearity(mask)
-            # append to all masks
-            masks.append(mask)
+            if masks is None:
+                # (B, num_outputs, F, T)
+                masks = mask.new_empty(B, len(self.output_layers), *mask.shape[1:])
+            masks[:, m] = mask
 
-        # stack masks along channel dimensions
-        masks = torch.stack(masks, dim=1)
+        # nonlinearity applied in-place on all masks
+        masks = masks.sigmoid_()
 
         return masks, mask_length
 
@@ -732,14 +918,29 @@ class MaskEstimatorGSS(NeuralModule):
     Args:
         num_iterations: Number of iterations for the EM algorithm
         eps: Small value for regularization
-        dtype: Data type for internal computations (default `torch.cdouble`)
+        dtype: Data type for internal computations (default `torch.cfloat`). With `torch.cfloat`,
+               the sum over time frames for the shape matrix is accumulated in double precision.
+        diag_reg: Diagonal regularization for the shape matrix BM, applied as diag_reg * trace(BM) / num_inputs + eps.
+                  Relative to the average diagonal value, so it is not lost in single precision.
+                  Regularization is applied for both `torch.cfloat` and `torch.cdouble`, so the default
+                  also slightly changes the masks calculated in double precision (on the order of 1e-6).
+                  Set to `None` to apply only `eps` on the diagonal.
 
     References:
         [1] Ito et al., Complex Angular Central Gaussian Mixture Model for Directional Statistics in Mask-Based Microphone Array Signal Processing, 2016
         [2] Boeddeker et al., Front-End Processing for the CHiME-5 Dinner Party Scenario, 2018
     """
 
-    def __init__(self, num_iterations: int = 3, eps: float = 1e-8, dtype: torch.dtype = torch.cdouble):
+    # number of time frames summed in single precision before accumulating in double precision
+    accumulation_block_size = 128
+
+    def __init__(
+        self,
+        num_iterations: int = 3,
+        eps: float = 1e-8,
+        dtype: torch.dtype = torch.cfloat,
+        diag_reg: Optional[float] = 1e-6,
+    ):
         super().__init__()
 
         if num_iterations <= 0:
@@ -759,10 +960,17 @@ class MaskEstimatorGSS(NeuralModule):
             raise ValueError(f'Unsupported dtype {dtype}, expecting cfloat or cdouble')
         self.dtype = dtype
 
+        if diag_reg is not None and diag_reg < 0:
+            raise ValueError(f'diag_reg must be non-negative, got {diag_reg}')
+
+        # diagonal regularization of the shape matrix
+        self.diag_reg = diag_reg
+
         logging.debug('Initialized %s', self.__class__.__name__)
         logging.debug('\tnum_iterations: %s', self.num_iterations)
         logging.debug('\teps:            %g', self.eps)
         logging.debug('\tdtype:          %s', self.dtype)
+        logging.debug('\tdiag_reg:       %g', self.diag_reg)
 
     def normalize(self, x: torch.Tensor, dim: int = 1) -> torch.Tensor:
         """Normalize input to have a unit L2-norm across `dim`.
@@ -775,9 +983,7 @@ class MaskEstimatorGSS(NeuralModule):
         Returns:
             Normalized signal, shape (B, C, F, T)
         """
-        norm_x = torch.linalg.vector_norm(x, ord=2, dim=dim, keepdim=True)
-        x = x / (norm_x + self.eps)
-        return x
+        return _normalize_l2(x, dim=dim, eps=self.eps)
 
     @typecheck(
         input_types={
@@ -798,17 +1004,21 @@ class MaskEstimatorGSS(NeuralModule):
         Returns:
             Masks for the components of the model, shape (B, num_outputs, F, T)
         """
-        # (B, num_outputs, F)
-        # normalize across outputs in the log domain
-        log_gamma = log_pdf - torch.max(log_pdf, axis=-3, keepdim=True)[0]
+        # weight and source activity in the log domain, shape (B, num_outputs, F, T)
+        # zero weight or inactivity results in -inf, i.e., a zero mask for the component
+        log_weight = torch.log(alpha)[..., None] + torch.log(activity.to(log_pdf.dtype))[..., None, :]
 
-        gamma = torch.exp(log_gamma)
+        # bins where all components have zero weight or are inactive, shape (B, 1, F, T)
+        # weights are reset to avoid NaNs in softmax, and the masks are set to zero below
+        inactive = torch.all(torch.isneginf(log_weight), dim=-3, keepdim=True)
+        log_weight = log_weight.masked_fill(inactive, 0.0)
 
-        # calculate the mask using weight, pdf and source activity
-        gamma = alpha[..., None] * gamma * activity[..., None, :]
+        # calculate the mask using weight, pdf and source activity,
+        # normalized across components/output channels
+        gamma = torch.softmax(log_pdf + log_weight, dim=-3)
 
-        # normalize across components/output channels
-        gamma = gamma / (torch.sum(gamma, dim=-3, keepdim=True) + self.eps)
+        # bins without any active component are masked out, in-place on the fresh softmax output
+        gamma.masked_fill_(inactive, 0.0)
 
         return gamma
 
@@ -828,6 +1038,33 @@ class MaskEstimatorGSS(NeuralModule):
         alpha = torch.mean(gamma, dim=-1)
         return alpha
 
+    def accumulate_shape_matrix(self, scale: torch.Tensor, z: torch.Tensor) -> torch.Tensor:
+        """Sum the scaled outer products of directional statistics over time.
+
+        Args:
+            scale: scale for each component, shape (B, num_outputs, F, T)
+            z: directional statistics, shape (B, num_inputs, F, T)
+
+        Returns:
+            Sum over time, shape (B, num_outputs, F, num_inputs, num_inputs), in double precision.
+            For single-precision `z`, partial sums over blocks of `accumulation_block_size`
+            time frames are calculated in single precision and accumulated in double precision.
+        """
+        scale = scale.to(z.dtype)
+        if z.dtype == torch.cdouble:
+            return torch.einsum('bmft,bift,bjft->bmfij', scale, z, z.conj())
+
+        # sum over blocks of time frames in single precision,
+        # and accumulate the partial sums in double precision
+        BM = 0
+        for t_start in range(0, z.size(-1), self.accumulation_block_size):
+            t_block = slice(t_start, t_start + self.accumulation_block_size)
+            BM_block = torch.einsum(
+                'bmft,bift,bjft->bmfij', scale[..., t_block], z[..., t_block], z[..., t_block].conj()
+            )
+            BM = BM + BM_block.to(torch.cdouble)
+        return BM
+
     @typecheck(
         input_types={
             'z': NeuralType(('B', 'C', 'D', 'T')),
@@ -856,47 +1093,62 @@ class MaskEstimatorGSS(NeuralModule):
 
         # scale outer product and sum over time
         # shape (B, num_outputs, F, num_inputs, num_inputs)
-        BM = num_inputs * torch.einsum('bmft,bift,bjft->bmfij', scale.to(z.dtype), z, z.conj())
+        BM = self.accumulate_shape_matrix(scale=scale, z=z)
 
-        # normalize across time
+        # normalize across time, scaling by num_inputs folded into the normalization
         denom = torch.sum(gamma, dim=-1)
-        BM = BM / (denom[..., None, None] + self.eps)
+        BM = BM * (num_inputs / (denom[..., None, None] + self.eps))
 
         # make sure the matrix is Hermitian
         BM = (BM + BM.conj().transpose(-1, -2)) / 2
 
-        # use eigenvalue decomposition to calculate the log determinant
-        # and the inverse-weighted energy term
-        L, Q = torch.linalg.eigh(BM)
+        # diagonal regularization to avoid numerical issues, in-place on the symmetrized matrix
+        # regularization relative to the average diagonal value is not lost when rounding to single precision
+        BM_diag = BM.diagonal(dim1=-2, dim2=-1)
+        if self.diag_reg:
+            BM_diag.add_(self.diag_reg * BM_diag.real.mean(dim=-1, keepdim=True) + self.eps)
+        else:
+            BM_diag.add_(self.eps)
 
-        # BM is positive definite, so all eigenvalues should be positive
-        # However, small negative values may occur due to a limited precision
-        L = torch.clamp(L.real, min=self.eps)
+        # decomposition in the precision of internal computations
+        BM = BM.to(z.dtype)
 
         # PDF is invariant to scaling of the shape matrix [1], so
-        # eignevalues can be normalized (across num_inputs)
-        L = L / (torch.max(L, axis=-1, keepdim=True)[0] + self.eps)
+        # no normalization is required before the decomposition
+        try:
+            # use Cholesky decomposition to calculate the log determinant
+            # and the inverse-weighted energy term
+            L = torch.linalg.cholesky(BM)
+
+            # calculate the log determinant using the diagonal of the Cholesky factor
+            log_detBM = 2 * torch.sum(torch.log(L.diagonal(dim1=-2, dim2=-1).real), dim=-1)
+
+            # calc L^{-1} * z using forward substitution, shape (B, num_outputs, F, num_inputs, T)
+            zH_invBM_z = torch.linalg.solve_triangular(L, z.transpose(-3, -2).unsqueeze(1), upper=False)
+            # calc squared norm
+            zH_invBM_z = zH_invBM_z.abs().pow(2).sum(-2)
+        except torch.linalg.LinAlgError:
+            logging.warning('Cholesky failed, fallback to eigenvalue decomposition')
 
-        # small regularization to avoid numerical issues
-        L = L + self.eps
+            L, Q = torch.linalg.eigh(BM)
 
-        # calculate the log determinant using the eigenvalues
-        log_detBM = torch.sum(torch.log(L), dim=-1)
+            # BM is positive definite, so all eigenvalues should be positive
+            # However, small negative values may occur due to a limited precision
+            L = torch.clamp(L.real, min=self.eps)
 
-        # calculate the energy term using the inverse eigenvalues
-        # NOTE: keeping an alternative implementation for reference (slower)
-        # zH_invBM_z = torch.einsum('bift,bmfij,bmfj,bmfkj,bkft->bmft', z.conj(), Q, (1 / L).to(Q.dtype), Q.conj(), z)
-        # zH_invBM_z = zH_invBM_z.abs() + self.eps # small regularization
+            # calculate the log determinant using the eigenvalues
+            log_detBM = torch.sum(torch.log(L), dim=-1)
 
-        # calc sqrt(L) * Q^H * z
-        zH_invBM_z = torch.einsum('bmfj,bmfkj,bkft->bmftj', (1 / L.sqrt()).to(Q.dtype), Q.conj(), z)
-        # calc squared norm
-        zH_invBM_z = zH_invBM_z.abs().pow(2).sum(-1)
-        # small regularization
-        zH_invBM_z = zH_invBM_z + self.eps
+            # calc sqrt(L) * Q^H * z
+            zH_invBM_z = torch.einsum('bmfj,bmfkj,bkft->bmftj', (1 / L.sqrt()).to(Q.dtype), Q.conj(), z)
+            # calc squared norm
+            zH_invBM_z = zH_invBM_z.abs().pow(2).sum(-1)
+
+        # small regularization, in-place on the freshly reduced energy term
+        zH_invBM_z.add_(self.eps)
 
         # final log PDF
-        log_pdf = -num_inputs * torch.log(zH_invBM_z) - log_detBM[..., None]
+        log_pdf = torch.log(zH_invBM_z).mul_(-num_inputs).sub_(log_detBM[..., None])
 
         return log_pdf, zH_invBM_z
 
@@ -952,11 +1204,12 @@ class MaskEstimatorGSS(NeuralModule):
             gamma = torch.clamp(activity, min=self.eps)
             # normalize across channels
             gamma = gamma / torch.sum(gamma, dim=-2, keepdim=True)
-            # expand to input shape
-            gamma = gamma.unsqueeze(2).expand(-1, -1, F, -1)
+            # initial masks are the same for all subbands, so they are kept with a singleton
+            # subband dimension and broadcast in the first iteration, shape (B, num_outputs, 1, T)
+            gamma = gamma.unsqueeze(2)
 
-            # initialize the energy term
-            zH_invBM_z = torch.ones(B, num_outputs, F, T, dtype=input.dtype, device=input.device)
+            # initialize the energy term, broadcast in the same way as the masks
+            zH_invBM_z = torch.ones_like(gamma)
 
             # EM iterations
             for it in range(self.num_iterations):
@@ -982,7 +1235,13 @@ class MaskEstimatorGSS(torch.nn.Module):
     Args:
         num_iterations: Number of iterations for the EM algorithm
         eps: Small value for regularization
-        dtype: Data type for internal computations
+        dtype: Data type for internal computations (default `torch.cfloat`). With `torch.cfloat`,
+               the sum over time frames for the shape matrix is accumulated in double precision.
+        diag_reg: Diagonal regularization for the shape matrix BM, applied as diag_reg * trace(BM) / num_inputs + eps.
+                  Relative to the average diagonal value, so it is not lost in single precision.
+                  Regularization is applied for both `torch.cfloat` and `torch.cdouble`, so the default
+                  also slightly changes the masks calculated in double precision (on the order of 1e-6).
+                  Set to `None` to apply only `eps` on the diagonal.
 
 
     References:
@@ -990,7 +1249,10 @@ class MaskEstimatorGSS(torch.nn.Module):
         [2] Boeddeker et al., Front-End Processing for the CHiME-5 Dinner Party Scenario, 2018
     """
 
-    def __init__(self, num_iterations: int = 3, eps=1e-8, dtype: torch.dtype = torch.cdouble):
+    # number of time frames summed in single precision before accumulating in double precision
+    accumulation_block_size = 128
+
+    def __init__(self, num_iterations: int = 3, eps=1e-8, dtype: torch.dtype = torch.cfloat, diag_reg=1e-6):
         super().__init__()
 
         self.num_iterations = num_iterations
@@ -998,11 +1260,13 @@ class MaskEstimatorGSS(torch.nn.Module):
         # Internal calculations
         assert dtype in [torch.cfloat, torch.cdouble], f'Unsupported dtype {dtype}, expecting cfloat or cdouble'
         self.dtype = dtype
+        self.diag_reg = diag_reg
 
         logging.debug('Initialized %s', self.__class__.__name__)
         logging.debug('\tnum_iterations: %s', self.num_iterations)
         logging.debug('\teps:            %g', self.eps)
         logging.debug('\tdtype:          %s', self.dtype)
+        logging.debug('\tdiag_reg:       %g', self.diag_reg)
 
     def normalize(self, x: torch.Tensor, dim=-3) -> torch.Tensor:
         """Normalize input to have a unit L2-norm across `dim`.
@@ -1015,9 +1279,7 @@ class MaskEstimatorGSS(torch.nn.Module):
         Returns:
             Normalized signal, shape (B, C, F, T)
         """
-        norm_x = torch.linalg.vector_norm(x, ord=2, dim=dim, keepdim=True)
-        x = x / (norm_x + self.eps)
-        return x
+        return _normalize_l2(x, dim=dim, eps=self.eps)
 
     def update_masks(self, alpha: torch.Tensor, activity, log_pdf):
         """Update masks for the cACGMM.
@@ -1030,19 +1292,21 @@ class MaskEstimatorGSS(torch.nn.Module):
         Returns:
             Masks for the components of the model, shape (B, num_outputs, F, T)
         """
-        num_inputs = log_pdf.size(-1)
-
-        # (B, num_outputs, F)
-        # normalize across outputs in the log domain
-        gamma = log_pdf - torch.max(log_pdf, axis=-3, keepdim=True)[0]
+        # weight and source activity in the log domain, shape (B, num_outputs, F, T)
+        # zero weight or inactivity results in -inf, i.e., a zero mask for the component
+        log_weight = torch.log(alpha)[..., None] + torch.log(activity.to(log_pdf.dtype))[..., None, :]
 
-        gamma = torch.exp(gamma)
+        # bins where all components have zero weight or are inactive, shape (B, 1, F, T)
+        # weights are reset to avoid NaNs in softmax, and the masks are set to zero below
+        inactive = torch.all(torch.isneginf(log_weight), dim=-3, keepdim=True)
+        log_weight = log_weight.masked_fill(inactive, 0.0)
 
-        # calculate the mask using weight, pdf and source activity
-        gamma = alpha[..., None] * gamma * activity[..., None, :]
+        # calculate the mask using weight, pdf and source activity,
+        # normalized across components/output channels
+        gamma = torch.softmax(log_pdf + log_weight, dim=-3)
 
-        # normalize across components/output channels
-        gamma = gamma / (torch.sum(gamma, dim=-3, keepdim=True) + self.eps)
+        # bins without any active component are masked out, in-place on the fresh softmax output
+        gamma.masked_fill_(inactive, 0.0)
 
         return gamma
 
@@ -1059,6 +1323,33 @@ class MaskEstimatorGSS(torch.nn.Module):
         alpha = torch.mean(gamma, dim=-1)
         return alpha
 
+    def accumulate_shape_matrix(self, scale: torch.Tensor, z: torch.Tensor) -> torch.Tensor:
+        """Sum the scaled outer products of directional statistics over time.
+
+        Args:
+            scale: scale for each component, shape (B, num_outputs, F, T)
+            z: directional statistics, shape (B, num_inputs, F, T)
+
+        Returns:
+            Sum over time, shape (B, num_outputs, F, num_inputs, num_inputs), in double precision.
+            For single-precision `z`, partial sums over blocks of `accumulation_block_size`
+            time frames are calculated in single precision and accumulated in double precision.
+        """
+        scale = scale.to(z.dtype)
+        if z.dtype == torch.cdouble:
+            return torch.einsum('bmft,bift,bjft->bmfij', scale, z, z.conj())
+
+        # sum over blocks of time frames in single precision,
+        # and accumulate the partial sums in double precision
+        BM = 0
+        for t_start in range(0, z.size(-1), self.accumulation_block_size):
+            t_block = slice(t_start, t_start + self.accumulation_block_size)
+            BM_block = torch.einsum(
+                'bmft,bift,bjft->bmfij', scale[..., t_block], z[..., t_block], z[..., t_block].conj()
+            )
+            BM = BM + BM_block.to(torch.cdouble)
+        return BM
+
     def update_pdf(
         self, z: torch.Tensor, gamma: torch.Tensor, zH_invBM_z: torch.Tensor
     ) -> Tuple[torch.Tensor, torch.Tensor]:
@@ -1079,50 +1370,63 @@ class MaskEstimatorGSS(torch.nn.Module):
 
         # scale outer product and sum over time
         # shape (B, num_outputs, F, num_inputs, num_inputs)
-        BM = num_inputs * torch.einsum('bmft,bift,bjft->bmfij', scale.to(z.dtype), z, z.conj())
+        BM = self.accumulate_shape_matrix(scale=scale, z=z)
 
-        # normalize across time
+        # normalize across time, scaling by num_inputs folded into the normalization
         denom = torch.sum(gamma, dim=-1)
-        BM = BM / (denom[..., None, None] + self.eps)
+        BM = BM * (num_inputs / (denom[..., None, None] + self.eps))
 
         # make sure the matrix is Hermitian
         BM = (BM + BM.conj().transpose(-1, -2)) / 2
 
-        # use eigenvalue decomposition to calculate the log determinant
-        # --
-        # and the inverse-weighted energy term
-        L, Q = torch.linalg.eigh(BM)
+        # diagonal regularization to avoid numerical issues, in-place on the symmetrized matrix
+        # regularization relative to the average diagonal value is not lost when rounding to single precision
+        BM_diag = BM.diagonal(dim1=-2, dim2=-1)
+        if self.diag_reg:
+            BM_diag.add_(self.diag_reg * BM_diag.real.mean(dim=-1, keepdim=True) + self.eps)
+        else:
+            BM_diag.add_(self.eps)
 
-        # BM is positive definite, so all eigenvalues should be positive
-        # However, small negative values may occur due to a limited precision
-        L = torch.clamp(L.real, min=self.eps)
+        # decomposition in the precision of internal computations
+        BM = BM.to(z.dtype)
 
         # PDF is invariant to scaling of the shape matrix [1], so
-        # eignevalues can be normalized (across num_inputs)
-        L = L / (torch.max(L, axis=-1, keepdim=True)[0] + self.eps)
+        # no normalization is required before the decomposition
+        try:
+            # use Cholesky decomposition to calculate the log determinant
+            # and the inverse-weighted energy term
+            L = torch.linalg.cholesky(BM)
 
-        # small regularization to avoid numerical issues
-        L = L + self.eps
+            # calculate the log determinant using the diagonal of the Cholesky factor
+            log_detBM = 2 * torch.sum(torch.log(L.diagonal(dim1=-2, dim2=-1).real), dim=-1)
 
-        # calculate the log determinant using the eigenvalues
-        log_detBM = torch.sum(torch.log(L), dim=-1)
+            # calc L^{-1} * z using forward substitution, shape (B, num_outputs, F, num_inputs, T)
+            zH_invBM_z = torch.linalg.solve_triangular(L, z.transpose(-3, -2).unsqueeze(1), upper=False)
+            # calc squared norm
+            zH_invBM_z = zH_invBM_z.abs().pow(2).sum(-2)
+        except torch.linalg.LinAlgError:
+            logging.warning('Cholesky failed, fallback to eigenvalue decomposition')
 
-        # calculate the energy term using the inverse eigenvalues
-        # --
-        # zH_invBM_z = torch.einsum('bift,bmfij,bmfj,bmfkj,bkft->bmft', z.conj(), Q, (1 / L).to(Q.dtype), Q.conj(), z)
-        # # small regularization
-        # zH_invBM_z = zH_invBM_z.abs() + self.eps
+            L, Q = torch.linalg.eigh(BM)
 
-        # calc sqrt(L) * Q^H * z
-        zH_invBM_z = torch.einsum('bmfj,bmfkj,bkft->bmftj', (1 / L.sqrt()).to(Q.dtype), Q.conj(), z)
-        # calc squared norm
-        zH_invBM_z = zH_invBM_z.abs().pow(2).sum(-1)
-        # small regularization
-        zH_invBM_z = zH_invBM_z + self.eps
+            # BM is positive definite, so all eigenvalues should be positive
+            # However, small negative values may occur due to a limited precision
+            L = torch.clamp(L.real, min=self.eps)
+
+            # calculate the log determinant using the eigenvalues
+            log_detBM = torch.sum(torch.log(L), dim=-1)
+
+            # calc sqrt(L) * Q^H * z
+            zH_invBM_z = torch.einsum('bmfj,bmfkj,bkft->bmftj', (1 / L.sqrt()).to(Q.dtype), Q.conj(), z)
+            # calc squared norm
+            zH_invBM_z = zH_invBM_z.abs().pow(2).sum(-1)
+
+        # small regularization, in-place on the freshly reduced energy term
+        zH_invBM_z.add_(self.eps)
 
         # final log PDF
         # --
-        log_pdf = -num_inputs * torch.log(zH_invBM_z) - log_detBM[..., None]
+        log_pdf = torch.log(zH_invBM_z).mul_(-num_inputs).sub_(log_detBM[..., None])
 
         return log_pdf, zH_invBM_z
 
@@ -1156,11 +1460,12 @@ class MaskEstimatorGSS(torch.nn.Module):
             gamma = torch.clamp(activity, min=self.eps)
             # normalize across channels
             gamma = gamma / torch.sum(gamma, dim=-2, keepdim=True)
-            # expand to input shape
-            gamma = gamma.unsqueeze(2).expand(-1, -1, F, -1)
+            # initial masks are the same for all subbands, so they are kept with a singleton
+            # subband dimension and broadcast in the first iteration, shape (B, num_outputs, 1, T)
+            gamma = gamma.unsqueeze(2)
 
-            # initialize energy term
-            zH_invBM_z = torch.ones(B, num_outputs, F, T, dtype=input.dtype, device=input.device)
+            # initialize energy term, broadcast in the same way as the masks
+            zH_invBM_z = torch.ones_like(gamma)
 
             # EM iterations
             for it in range(self.num_iterations):
@@ -1235,7 +1540,7 @@ class MaskReferenceChannel(NeuralModule):
         mask = torch.clamp(mask, min=self.mask_min, max=self.mask_max)
 
         # Apply each output mask on the ref channel
-        output = mask * input[:, self.ref_channel : self.ref_channel + 1, ...]
+        output = mask * torch.select(input, 1, self.ref_channel).unsqueeze(1)
         return output, input_length
 
 
@@ -1256,6 +1561,10 @@ class MaskBasedBeamformer(NeuralModule):
         mask_max_db: Threshold mask to a maximal value before applying it, defaults to 0dB
         diag_reg: Optional, diagonal regularization for the multichannel filter
         eps: Small regularization constant to avoid division by zero
+
+    Note:
+        Per-channel reductions require coalesced channel storage, so the input is
+        converted to `torch.channels_last` before estimating the signal statistics.
     """
 
     def __init__(
@@ -1368,53 +1677,66 @@ class MaskBasedBeamformer(NeuralModule):
         Returns:
             Multichannel output signal complex-valued spectrogram, shape (B, num_masks * M, F, N)
         """
-        # Length mask
+        B, C, F, N = input.shape
+        num_masks = mask.size(1)
+
+        # Length mask, shape (B, 1, 1, N)
         if input_length is not None:
             length_mask: torch.Tensor = make_seq_mask_like(
-                lengths=input_length, like=mask[:, 0, ...], time_dim=-1, valid_ones=False
+                lengths=input_length, like=mask, time_dim=-1, valid_ones=False
             )
 
-        # Use each mask to generate an output
-        output, num_masks = [], mask.size(1)
-        for m in range(num_masks):
-            # Desired signal mask
-            mask_d = mask[:, m, ...]
-            # Undesired signal mask
-            if mask_undesired is not None:
-                mask_u = mask_undesired[:, m, ...]
-            elif num_masks == 1:
+        # Desired and undesired signal masks, shape (2, B, num_masks, F, N)
+        if mask_undesired is None:
+            # Undesired masks are calculated in-place in the stacked copy
+            mask_du = mask.unsqueeze(0).repeat(2, 1, 1, 1, 1)
+            if num_masks == 1:
                 # If a single mask is estimated, use the complement
-                mask_u = 1 - mask_d
+                mask_du[1].neg_().add_(1)
             else:
                 # Use sum of all other sources
-                mask_u = torch.sum(mask, dim=1) - mask_d
+                mask_du[1].neg_().add_(torch.sum(mask, dim=1, keepdim=True))
+        else:
+            mask_du = torch.stack([mask, mask_undesired], dim=0)
 
-            # Threshold masks
-            mask_d = torch.clamp(mask_d, min=self.mask_min, max=self.mask_max)
-            mask_u = torch.clamp(mask_u, min=self.mask_min, max=self.mask_max)
+        # Threshold both masks at once
+        mask_du.clamp_(min=self.mask_min, max=self.mask_max)
 
-            if input_length is not None:
-                mask_d = mask_d.masked_fill(length_mask, 0.0)
-                mask_u = mask_u.masked_fill(length_mask, 0.0)
+        if input_length is not None:
+            mask_du.masked_fill_(length_mask, 0.0)
+
+        mask_d, mask_u = mask_du[0], mask_du[1]
+
+        # Process all masks at once by folding masks into the batch dimension.
+        # Keep channels as the innermost dimension, since signal statistics
+        # are calculated across channels for each mask.
+        # (B, C, F, N) -> (B * num_masks, C, F, N)
+        input_all = torch.empty(
+            B * num_masks, C, F, N, dtype=input.dtype, device=input.device, memory_format=torch.channels_last
+        )
+        input_all.view(B, num_masks, C, F, N).copy_(input.unsqueeze(1))
 
-            # Apply filter
-            output_m = self.filter(input=input, mask_s=mask_d, mask_n=mask_u)
+        # Apply filter for all masks
+        # (B * num_masks, M, F, N)
+        output = self.filter(
+            input=input_all, mask_s=mask_d.reshape(B * num_masks, F, N), mask_n=mask_u.reshape(B * num_masks, F, N)
+        )
 
-            # Optional: apply a postmask with min and max thresholds
-            if self.postmask_min < self.postmask_max:
-                postmask_m = torch.clamp(mask[:, m, ...], min=self.postmask_min, max=self.postmask_max)
-                output_m = output_m * postmask_m.unsqueeze(1)
+        # (B * num_masks, M, F, N) -> (B, num_masks, M, F, N)
+        output = output.reshape(B, num_masks, -1, F, N)
 
-            # Save the current output (B, M, F, T)
-            output.append(output_m)
+        # Optional: apply a postmask with min and max thresholds
+        if self.postmask_min < self.postmask_max:
+            postmask = torch.clamp(mask, min=self.postmask_min, max=self.postmask_max)
+            output = output * postmask.unsqueeze(2)
 
         # Combine outputs along the channel dimension
-        # Each output is (B, M, F, T)
-        output = torch.concatenate(output, axis=1)
+        # (B, num_masks, M, F, N) -> (B, num_masks * M, F, N)
+        output = output.reshape(B, -1, F, N)
 
         # Apply masking
         if input_length is not None:
-            output = output.masked_fill(length_mask[:, None, ...], 0.0)
+            output = output.masked_fill(length_mask, 0.0)
 
         return output, input_length
 
@@ -1431,6 +1753,14 @@ class WPEFilter(NeuralModule):
         prediction_delay: Prediction delay in frames
         diag_reg: Diagonal regularization for the correlation matrix Q, applied as diag_reg * trace(Q) + eps
         eps: Small positive constant for regularization
+        accumulation_dtype: Optional, data type for accumulation of the correlation matrices over time
+                            and for estimation of the filter, e.g., `torch.cdouble` with `torch.cfloat` input.
+                            Defaults to `None`, which uses the data type of the input.
+
+    Note:
+        Correlation matrices and filtering are calculated using matrix products with channels
+        in the innermost dimension, so the input is converted to `torch.channels_last`, i.e.,
+        stored in (B, F, N, C) order. The output is returned in the same memory format.
 
     References:
         - Yoshioka and Nakatani, Generalization of Multi-Channel Linear Prediction
@@ -1438,18 +1768,33 @@ class WPEFilter(NeuralModule):
         - Jukić et al, Group sparsity for MIMO speech dereverberation, 2015
     """
 
-    def __init__(self, filter_length: int, prediction_delay: int, diag_reg: Optional[float] = 1e-6, eps: float = 1e-8):
+    # number of time frames summed in the input precision before accumulating in `accumulation_dtype`
+    accumulation_block_size = 128
+
+    def __init__(
+        self,
+        filter_length: int,
+        prediction_delay: int,
+        diag_reg: Optional[float] = 1e-6,
+        eps: float = 1e-8,
+        accumulation_dtype: Optional[torch.dtype] = None,
+    ):
         super().__init__()
         self.filter_length = filter_length
         self.prediction_delay = prediction_delay
         self.diag_reg = diag_reg
         self.eps = eps
 
+        if accumulation_dtype not in [None, torch.cfloat, torch.cdouble]:
+            raise ValueError(f'Unsupported accumulation dtype {accumulation_dtype}, expecting cfloat or cdouble')
+        self.accumulation_dtype = accumulation_dtype
+
         logging.debug('Initialized %s', self.__class__.__name__)
-        logging.debug('\tfilter_length:    %d', self.filter_length)
-        logging.debug('\tprediction_delay: %d', self.prediction_delay)
-        logging.debug('\tdiag_reg:         %g', self.diag_reg)
-        logging.debug('\teps:              %g', self.eps)
+        logging.debug('\tfilter_length:      %d', self.filter_length)
+        logging.debug('\tprediction_delay:   %d', self.prediction_delay)
+        logging.debug('\tdiag_reg:           %g', self.diag_reg)
+        logging.debug('\teps:                %g', self.eps)
+        logging.debug('\taccumulation_dtype: %s', self.accumulation_dtype)
 
     @property
     def input_types(self) -> Dict[str, NeuralType]:
@@ -1487,18 +1832,31 @@ class WPEFilter(NeuralModule):
             shape as the input signal (B, C, F, N), and the output length is the same
             as the input length.
         """
+        # Store channels as the innermost dimension, (B, F, N, C) in memory
+        input = input.to(memory_format=torch.channels_last)
+
         # Temporal weighting: average power over channels, output shape (B, F, N)
-        weight = torch.mean(power, dim=1)
-        # Use inverse power as the weight
-        weight = 1 / (weight + self.eps)
+        # Use inverse power as the weight, calculated in-place on the average
+        weight = torch.mean(power, dim=1).add_(self.eps).reciprocal_()
+
+        if input_length is not None:
+            # Mask for padded frames, shape (B, 1, N)
+            # Used for both correlation estimation and the output
+            length_mask: torch.Tensor = make_seq_mask_like(
+                lengths=input_length, like=weight, time_dim=-1, valid_ones=False
+            )
+        else:
+            length_mask = None
 
         # Multi-channel convolution matrix for each subband
         tilde_input = self.convtensor(input, filter_length=self.filter_length, delay=self.prediction_delay)
 
+        # Pack the convolution matrix and the input once,
+        # the packed buffer is used for both estimation and filtering
+        tilde_input = self.pack_convtensor(tilde_input=tilde_input, input=input)
+
         # Estimate correlation matrices
-        Q, R = self.estimate_correlations(
-            input=input, weight=weight, tilde_input=tilde_input, input_length=input_length
-        )
+        Q, R = self.estimate_correlations(input=input, weight=weight, tilde_input=tilde_input, length_mask=length_mask)
 
         # Estimate prediction filter
         G = self.estimate_filter(Q=Q, R=R)
@@ -1509,12 +1867,10 @@ class WPEFilter(NeuralModule):
         # Dereverberation
         desired_signal = input - undesired_signal
 
-        if input_length is not None:
-            # Mask padded frames
-            length_mask: torch.Tensor = make_seq_mask_like(
-                lengths=input_length, like=desired_signal, time_dim=-1, valid_ones=False
-            )
-            desired_signal = desired_signal.masked_fill(length_mask, 0.0)
+        if length_mask is not None:
+            # Mask padded frames, in-place on the fresh output
+            # Note: masked_fill sets the padded frames to zero even if they are not finite
+            desired_signal.masked_fill_(length_mask.unsqueeze(1), 0.0)
 
         return desired_signal, input_length
 
@@ -1549,6 +1905,9 @@ class WPEFilter(NeuralModule):
             # Keep the same length as the input signal
             n_steps = N
 
+        # Frames after `n_steps` are not used, so they are not included in the padded copy
+        x = x[..., :n_steps]
+
         # Pad temporal dimension
         x = torch.nn.functional.pad(x, (filter_length - 1 + delay, 0))
 
@@ -1581,26 +1940,52 @@ class WPEFilter(NeuralModule):
         x = x.permute(0, 2, 3, 1, 4)
         x = x.reshape(B, F, N, C * filter_length)
 
-        permute = []
-        for m in range(C):
-            permute[m * filter_length : (m + 1) * filter_length] = m * filter_length + np.flip(
-                np.arange(filter_length)
-            )
+        # Reverse the order of filter taps for each channel
+        permute = _convtensor_permutation(C, filter_length).to(x.device)
         return x[..., permute]
 
+    @classmethod
+    def pack_convtensor(cls, tilde_input: torch.Tensor, input: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """Pack the convolution tensor into a contiguous buffer with a matrix
+        of shape (N, C * filter_length) for each (b, f), as used in matrix products.
+        Optionally, the input signal is appended as the last C columns.
+
+        Unlike `permute_convtensor`, the order of filter taps is not flipped.
+
+        Args:
+            tilde_input: output of self.convtensor, shape (B, C, F, N, filter_length)
+            input: Optional, input signal, shape (B, C, F, N)
+
+        Returns:
+            Packed tensor with shape (B, F, N, C * filter_length), or
+            (B, F, N, C * filter_length + C) if `input` is provided.
+        """
+        B, C, F, N, filter_length = tilde_input.shape
+        num_columns = C * filter_length if input is None else C * filter_length + C
+
+        packed = tilde_input.new_empty(B, F, N, num_columns)
+        packed[..., : C * filter_length].view(B, F, N, C, filter_length).copy_(tilde_input.permute(0, 2, 3, 1, 4))
+        if input is not None:
+            packed[..., C * filter_length :].copy_(input.permute(0, 2, 3, 1))
+
+        return packed
+
     def estimate_correlations(
         self,
         input: torch.Tensor,
         weight: torch.Tensor,
         tilde_input: torch.Tensor,
-        input_length: Optional[torch.Tensor] = None,
+        length_mask: Optional[torch.Tensor] = None,
     ) -> Tuple[torch.Tensor]:
         """
         Args:
             input: Input signal, shape (B, C, F, N)
             weight: Time-frequency weight, shape (B, F, N)
-            tilde_input: Multi-channel convolution tensor, shape (B, C, F, N, filter_length)
-            input_length: Length of each input example, shape (B)
+            tilde_input: Multi-channel convolution tensor, shape (B, C, F, N, filter_length),
+                         or the output of `self.pack_convtensor` with `input` appended,
+                         shape (B, F, N, C * filter_length + C)
+            length_mask: Optional, boolean mask with `True` for padded frames,
+                         broadcastable to `weight`, e.g., shape (B, 1, N)
 
         Returns:
             Returns a tuple of correlation matrices for each batch.
@@ -1622,20 +2007,63 @@ class WPEFilter(NeuralModule):
             The output is returned in a tensor with shape (B, F, C, filter_length, C). The last
             dimension corresponds to output channels.
         """
-        if input_length is not None:
+        if length_mask is not None:
             # Take only valid samples into account
-            length_mask: torch.Tensor = make_seq_mask_like(
-                lengths=input_length, like=weight, time_dim=-1, valid_ones=False
-            )
             weight = weight.masked_fill(length_mask, 0.0)
 
-        # Calculate (1)
+        B, C, F, N = input.shape
+
+        # Pack the convolution tensor and the input signal for each (b, f)
+        # into a single buffer, so that (1) and (2) are calculated using a single matrix product
+        # tilde{X} is stored in the first C * filter_length columns, X in the last C columns
+        # result: (B, F, N, C * filter_length + C)
+        if tilde_input.ndim == 5:
+            packed = self.pack_convtensor(tilde_input=tilde_input, input=input)
+        else:
+            packed = tilde_input
+        filter_length = self.filter_length
+
+        if packed.size(-1) != C * (filter_length + 1):
+            raise RuntimeError(
+                f'Expecting {C * (filter_length + 1)} columns in the packed convolution tensor '
+                f'including the input signal, got shape {packed.shape}'
+            )
+
+        if self.accumulation_dtype == torch.cfloat and packed.dtype == torch.cdouble:
+            raise RuntimeError(
+                f'Accumulation dtype {self.accumulation_dtype} has lower precision than the input dtype {packed.dtype}'
+            )
+
+        # Calculate (1) and (2) as tilde{X}^H * diag(w) * [tilde{X}, X]
+        # Batched matmul may materialize a conjugated copy of a conjugate view of tilde{X},
+        # so the product is evaluated as conj(tilde{X}^T * conj(diag(w) * [tilde{X}, X])),
+        # with conjugation applied in-place on the weighted buffer and on the result.
+        # Splitting the weight as sqrt(w) on both factors would give a Gram matrix B^H * B,
+        # but requires the same conjugated copy of B, so the weight is applied only once.
+        # result: (B, F, C * filter_length, C * filter_length + C)
+        tilde_packed = packed[..., : C * filter_length]
+        weighted_packed = (weight[..., None] * packed).conj_physical_()
+        if self.accumulation_dtype is None or self.accumulation_dtype == packed.dtype:
+            QR = torch.matmul(tilde_packed.transpose(-2, -1), weighted_packed)
+        else:
+            # sum over blocks of time frames in the input precision,
+            # and accumulate the partial sums in the accumulation precision
+            QR = 0
+            for n_start in range(0, N, self.accumulation_block_size):
+                n_block = slice(n_start, n_start + self.accumulation_block_size)
+                QR_block = torch.matmul(
+                    tilde_packed[..., n_block, :].transpose(-2, -1), weighted_packed[..., n_block, :]
+                )
+                QR = QR + QR_block.to(self.accumulation_dtype)
+        QR = QR.conj_physical_()
+
+        # Split (1)
         # result: (B, F, C, filter_length, C, filter_length)
-        Q = torch.einsum('bjfik,bmfin->bfjkmn', tilde_input.conj(), weight[:, None, :, :, None] * tilde_input)
+        Q = QR[..., : C * filter_length].reshape(B, F, C, filter_length, C, filter_length)
 
-        # Calculate (2)
+        # Split (2)
         # result: (B, F, C, filter_length, C)
-        R = torch.einsum('bjfik,bmfi->bfjkm', tilde_input.conj(), weight[:, None, :, :] * input)
+        R = QR[..., C * filter_length :].reshape(B, F, C, filter_length, C)
 
         return Q, R
 
@@ -1656,25 +2084,27 @@ class WPEFilter(NeuralModule):
             filter_length == self.filter_length
         ), f'Shape of Q {Q.shape} is not matching filter length {self.filter_length}'
 
-        # Reshape to analytical dimensions for each (b, f)
-        Q = Q.reshape(B, F, C * self.filter_length, C * filter_length)
-        R = R.reshape(B, F, C * self.filter_length, C)
+        # Reshape to analytical dimensions for each (b, f),
+        # with (b, f) flattened into a single batch dimension for the batched solver
+        Q = Q.reshape(B * F, C * self.filter_length, C * filter_length)
+        R = R.reshape(B * F, C * self.filter_length, C)
 
         # Diagonal regularization
         if self.diag_reg:
             # Regularization: diag_reg * trace(Q) + eps
-            diag_reg = self.diag_reg * torch.diagonal(Q, dim1=-2, dim2=-1).sum(-1).real + self.eps
-            # Apply regularization on Q
-            Q = Q + torch.diag_embed(diag_reg.unsqueeze(-1) * torch.ones(Q.shape[-1], device=Q.device))
+            Q_diag = torch.diagonal(Q, dim1=-2, dim2=-1)
+            diag_reg = self.diag_reg * Q_diag.sum(-1).real + self.eps
+            # Apply regularization on the diagonal of Q, without building a dense diagonal matrix
+            # Q is a view of the input correlation matrix, so the regularized matrix is a new tensor
+            Q = torch.diagonal_scatter(Q, Q_diag + diag_reg.unsqueeze(-1), dim1=-2, dim2=-1)
 
         # Solve for the filter
         fail = False
         try:
             # Use Cholesky decomposition
             QL = torch.linalg.cholesky(Q)
-            # Forward and backward substitution
-            G = torch.linalg.solve_triangular(QL, R, upper=False)
-            G = torch.linalg.solve_triangular(QL.conj().transpose(-2, -1), G, upper=True)
+            # Forward and backward substitution in a single call
+            G = torch.cholesky_solve(R, QL, upper=False)
         except torch.linalg.LinAlgError as e:
             fail = True
 
@@ -1700,7 +2130,9 @@ class WPEFilter(NeuralModule):
 
         Args:
             input: Input signal, shape (B, C, F, N)
-            tilde_input: Convolution matrix for the input signal, shape (B, C, F, N, filter_length)
+            tilde_input: Convolution matrix for the input signal, shape (B, C, F, N, filter_length),
+                         or the output of `self.pack_convtensor`, shape (B, F, N, C * filter_length)
+                         with optional additional columns
             filter: Prediction filter, shape (B, C, F, C, filter_length)
 
         Returns:
@@ -1715,8 +2147,19 @@ class WPEFilter(NeuralModule):
         if tilde_input is None:
             tilde_input = self.convtensor(input, filter_length=self.filter_length, delay=self.prediction_delay)
 
-        # For each (batch, output channel, f, time step), sum across (input channel, filter tap)
-        output = torch.einsum('bjfik,bmfjk->bmfi', tilde_input, filter)
+        if tilde_input.ndim == 5:
+            tilde_input = self.pack_convtensor(tilde_input=tilde_input)
+
+        B, C, F, _, filter_length = filter.shape
+
+        # Filter for each (b, f) with (input channel, filter tap) along rows and output channels along columns
+        # (B, C, F, C, filter_length) -> (B, F, C * filter_length, C)
+        # The filter may be estimated in a higher precision than the input
+        filter = filter.permute(0, 2, 3, 4, 1).reshape(B, F, C * filter_length, C).to(tilde_input.dtype)
+
+        # For each (batch, f, time step, output channel), sum across (input channel, filter tap)
+        # (B, F, N, C) -> (B, C, F, N)
+        output = torch.matmul(tilde_input[..., : C * filter_length], filter).permute(0, 3, 1, 2)
 
         return output
 
@@ -1734,10 +2177,21 @@ class MaskBasedDereverbWPE(NeuralModule):
         prediction_delay: Delay of the input signal for multi-channel linear prediction in frames.
         num_iterations: Number of iterations for reweighting
         mask_min_db: Threshold mask to a minimal value before applying it, defaults to -200dB
-        mask_max_db: Threshold mask to a minimal value before applying it, defaults to 0dB
+        mask_max_db: Threshold mask to a maximal value before applying it, defaults to 0dB.
+                     Set to `float('inf')` to skip the upper threshold.
         diag_reg: Diagonal regularization for WPE
         eps: Small regularization constant
         dtype: Data type for internal computations
+        accumulation_dtype: Optional, data type for accumulation of the correlation matrices and
+                            estimation of the filter. For example, `dtype=torch.cfloat` with
+                            `accumulation_dtype=torch.cdouble` processes the signals in single precision,
+                            while the correlation matrices are accumulated and solved in double precision.
+                            Defaults to `None`, which uses `dtype`.
+
+    Note:
+        Filter estimation is performed with channels in the innermost dimension, so
+        the input is converted to `torch.channels_last` and the output is returned
+        in the same memory format.
 
     References:
         - Kinoshita et al, Neural network-based spectrum estimation for online WPE dereverberation, 2017
@@ -1754,11 +2208,16 @@ class MaskBasedDereverbWPE(NeuralModule):
         diag_reg: Optional[float] = 1e-6,
         eps: float = 1e-8,
         dtype: torch.dtype = torch.cdouble,
+        accumulation_dtype: Optional[torch.dtype] = None,
     ):
         super().__init__()
         # Filter setup
         self.filter = WPEFilter(
-            filter_length=filter_length, prediction_delay=prediction_delay, diag_reg=diag_reg, eps=eps
+            filter_length=filter_length,
+            prediction_delay=prediction_delay,
+            diag_reg=diag_reg,
+            eps=eps,
+            accumulation_dtype=accumulation_dtype,
         )
         self.num_iterations = num_iterations
         # Mask thresholding
@@ -1767,6 +2226,8 @@ class MaskBasedDereverbWPE(NeuralModule):
         # Internal calculations
         if dtype not in [torch.cfloat, torch.cdouble]:
             raise ValueError(f'Unsupported dtype {dtype}, expecting torch.cfloat or torch.cdouble')
+        if accumulation_dtype == torch.cfloat and dtype == torch.cdouble:
+            raise ValueError(f'Accumulation dtype {accumulation_dtype} has lower precision than dtype {dtype}')
         self.dtype = dtype
 
         logging.debug('Initialized %s', self.__class__.__name__)
@@ -1811,23 +2272,22 @@ class MaskBasedDereverbWPE(NeuralModule):
         """
         io_dtype = input.dtype
 
-        with torch.cuda.amp.autocast(enabled=False):
-            output = input.to(dtype=self.dtype)
-
-            if not output.is_complex():
-                raise RuntimeError(f'Expecting complex input, got {output.dtype}')
-
-            for i in range(self.num_iterations):
-                magnitude = torch.abs(output)
-                if i == 0 and mask is not None:
-                    # Apply thresholds
-                    mask = torch.clamp(mask, min=self.mask_min, max=self.mask_max)
-                    # Mask magnitude
-                    magnitude = mask * magnitude
-                # Calculate power
-                power = magnitude ** 2
-                # Apply filter
-                output, output_length = self.filter(input=output, input_length=input_length, power=power)
+        # Conversion to internal dtype and layout in a single copy
+        # Note: autocast does not need to be disabled, since all internal calculations
+        # are performed on complex-valued tensors in `self.dtype` or their real-valued
+        # power, which are not cast to a reduced precision
+        output = input.to(dtype=self.dtype, memory_format=torch.channels_last)
+
+        if not output.is_complex():
+            raise RuntimeError(f'Expecting complex input, got {output.dtype}')
+
+        for i in range(self.num_iterations):
+            # Calculate power, with thresholded mask applied on the magnitude in the first iteration
+            power = _masked_power(output, mask if i == 0 else None, self.mask_min, self.mask_max)
+            # Apply filter on the output of the previous iteration
+            # Note: the convolution tensor is built from the current signal, so it changes
+            # in every iteration and it cannot be reused across iterations
+            output, output_length = self.filter(input=output, input_length=input_length, power=power)
 
         return output.to(io_dtype), output_length
 
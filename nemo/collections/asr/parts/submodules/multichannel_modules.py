@@ -513,7 +513,8 @@ class ParametricMultichannelWienerFilter(NeuralModule):
         diag_reg = self.diag_reg * self.trace(psd).real + self.eps
 
         # Apply regularization
-        psd = psd + torch.diag_embed(diag_reg.unsqueeze(-1) * torch.ones(psd.shape[-1], device=psd.device))
+        # Broadcast the per-matrix regularization along the diagonal without materializing a constant on device
+        psd = psd + torch.diag_embed(diag_reg.unsqueeze(-1).expand(*diag_reg.shape, psd.size(-1)))
 
         return psd
 
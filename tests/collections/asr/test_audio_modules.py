@@ -20,9 +20,11 @@ import pytest
 import torch
 
 from nemo.collections.asr.modules.audio_modules import (
+    MaskBasedBeamformer,
     MaskBasedDereverbWPE,
     MaskEstimatorFlexChannels,
     MaskEstimatorGSS,
+    MaskEstimatorRNN,
     MaskReferenceChannel,
     SpectrogramToMultichannelFeatures,
     WPEFilter,
@@ -137,7 +139,9 @@ class TestSpectrogramToMultichannelFeatures:
             assert ipd.shape == ipd_golden.shape, f'Feature shape not matching for example {n}'
 
             # Compare values
-            assert np.allclose(ipd, ipd_golden, atol=atol), f'Features not matching for example {n}'
+            # Phase difference is wrapped, since -pi and pi are equivalent
+            ipd_diff = np.angle(np.exp(1j * (ipd - ipd_golden)))
+            assert np.allclose(ipd_diff, 0, atol=atol), f'Features not matching for example {n}'
 
 
 class TestMaskBasedProcessor:
@@ -199,6 +203,87 @@ class TestMaskBasedProcessor:
                 # Compare values
                 assert np.allclose(out_np, out_golden, atol=atol), f'Output not matching for example {n}'
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_masks', [1, 3])
+    @pytest.mark.parametrize('use_mask_undesired', [False, True])
+    @pytest.mark.parametrize('ref_channel', [0, None])
+    @pytest.mark.parametrize('postmask_max_db', [0, -10])
+    def test_mask_based_beamformer(
+        self, num_masks: int, use_mask_undesired: bool, ref_channel: Optional[int], postmask_max_db: float
+    ):
+        """Test mask-based beamformer against a reference which processes each mask separately.
+        """
+        atol = 1e-5
+        batch_size = 4
+        num_channels = 4
+        num_subbands = 17
+        num_frames = 40
+        num_examples = 3
+
+        beamformer = MaskBasedBeamformer(
+            ref_channel=ref_channel,
+            mask_min_db=-60,
+            postmask_min_db=postmask_max_db - 10 if postmask_max_db < 0 else 0,
+            postmask_max_db=postmask_max_db,
+        )
+
+        def beamformer_golden(input, mask, mask_undesired, input_length):
+            """Process each mask separately."""
+            output = []
+            for m in range(num_masks):
+                mask_d = mask[:, m, ...]
+                if mask_undesired is not None:
+                    mask_u = mask_undesired[:, m, ...]
+                elif num_masks == 1:
+                    mask_u = 1 - mask_d
+                else:
+                    mask_u = torch.sum(mask, dim=1) - mask_d
+
+                mask_d = torch.clamp(mask_d, min=beamformer.mask_min, max=beamformer.mask_max)
+                mask_u = torch.clamp(mask_u, min=beamformer.mask_min, max=beamformer.mask_max)
+
+                if input_length is not None:
+                    for b, length in enumerate(input_length):
+                        mask_d[b, :, length:] = 0.0
+                        mask_u[b, :, length:] = 0.0
+
+                output_m = beamformer.filter(input=input, mask_s=mask_d, mask_n=mask_u)
+
+                if beamformer.postmask_min < beamformer.postmask_max:
+                    postmask_m = torch.clamp(mask[:, m, ...], min=beamformer.postmask_min, max=beamformer.postmask_max)
+                    output_m = output_m * postmask_m.unsqueeze(1)
+
+                output.append(output_m)
+
+            output = torch.cat(output, dim=1)
+
+            if input_length is not None:
+                for b, length in enumerate(input_length):
+                    output[b, ..., length:] = 0.0
+
+            return output
+
+        for n in range(num_examples):
+            spec = torch.randn(batch_size, num_channels, num_subbands, num_frames, dtype=torch.cfloat)
+            mask = torch.rand(batch_size, num_masks, num_subbands, num_frames)
+            mask_undesired = torch.rand_like(mask) if use_mask_undesired else None
+
+            for spec_length in [None, torch.randint(num_frames // 2, num_frames + 1, (batch_size,))]:
+                # UUT
+                out, out_length = beamformer(
+                    input=spec, mask=mask, mask_undesired=mask_undesired, input_length=spec_length
+                )
+
+                # Golden
+                out_golden = beamformer_golden(
+                    input=spec, mask=mask, mask_undesired=mask_undesired, input_length=spec_length
+                )
+
+                assert out.shape == out_golden.shape, f'Output shape not matching for example {n}'
+                assert torch.allclose(out, out_golden, atol=atol), f'Output not matching for example {n}'
+                if spec_length is not None:
+                    assert torch.equal(out_length, spec_length), f'Output length not matching for example {n}'
+
 
 class TestMaskBasedDereverb:
     @pytest.mark.unit
@@ -351,6 +436,136 @@ class TestMaskBasedDereverb:
             assert y.shape == x.shape, 'Output shape not matching, example {n}'
             assert torch.equal(y_length, x_length), 'Length not matching, example {n}'
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_channels', [1, 3])
+    @pytest.mark.parametrize('num_iterations', [1, 2])
+    def test_mask_based_dereverb_accumulation_dtype(self, num_channels: int, num_iterations: int):
+        """Test that dereverb in single precision with accumulation in double precision
+        matches dereverb in double precision.
+        """
+        # relative error, since the signal is processed in single precision
+        rtol = 1e-3
+        num_examples = 5
+        batch_size = 4
+        num_subbands = 15
+        # longer than the accumulation block
+        num_frames = 300
+        filter_length = 10
+        delay = 3
+
+        input_size = (batch_size, num_channels, num_subbands, num_frames)
+
+        dereverb_ref = MaskBasedDereverbWPE(
+            filter_length=filter_length, prediction_delay=delay, num_iterations=num_iterations, dtype=torch.cdouble
+        )
+        dereverb = MaskBasedDereverbWPE(
+            filter_length=filter_length,
+            prediction_delay=delay,
+            num_iterations=num_iterations,
+            dtype=torch.cfloat,
+            accumulation_dtype=torch.cdouble,
+        )
+
+        for n in range(num_examples):
+            # multi-channel input
+            x = torch.randn(input_size, dtype=torch.cdouble)
+            # random input_length
+            x_length = torch.randint(num_frames // 2, num_frames + 1, (batch_size,))
+            # multi-channel mask, bounded away from zero to avoid an ill-conditioned problem
+            mask = 0.1 + 0.9 * torch.rand(input_size)
+
+            # UUT
+            y, _ = dereverb(input=x, input_length=x_length, mask=mask)
+            y_ref, _ = dereverb_ref(input=x, input_length=x_length, mask=mask)
+
+            error = torch.linalg.vector_norm(y - y_ref) / torch.linalg.vector_norm(y_ref)
+            assert error < rtol, f'Output not matching, example {n}: relative error {error}'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_channels', [1, 3])
+    def test_wpe_filter_accumulation_dtype(self, num_channels: int):
+        """Test that correlation matrices are accumulated in the configured accumulation dtype.
+
+        The input has small integer values, so that partial sums over a single block of frames
+        are exact in single precision, while the sums over all frames are larger than 2**24
+        and cannot be represented exactly in single precision.
+        """
+        batch_size = 2
+        num_subbands = 3
+        num_frames = 64 * WPEFilter.accumulation_block_size
+        filter_length = 5
+        delay = 2
+
+        input_size = (batch_size, num_channels, num_subbands, num_frames)
+        x = torch.complex(torch.randint(0, 100, input_size).float(), torch.randint(0, 100, input_size).float())
+        weight = torch.ones(batch_size, num_subbands, num_frames)
+
+        def estimate_correlations(wpe_filter, x, weight):
+            tilde_x = wpe_filter.convtensor(x, filter_length=filter_length, delay=delay)
+            return wpe_filter.estimate_correlations(input=x, weight=weight, tilde_input=tilde_x)
+
+        # Reference in double precision
+        Q_ref, R_ref = estimate_correlations(
+            WPEFilter(filter_length=filter_length, prediction_delay=delay), x.to(torch.cdouble), weight.double()
+        )
+
+        # Single precision input with accumulation in double precision is exact
+        Q, R = estimate_correlations(
+            WPEFilter(filter_length=filter_length, prediction_delay=delay, accumulation_dtype=torch.cdouble), x, weight
+        )
+        assert Q.dtype == torch.cdouble, f'Unexpected dtype {Q.dtype} for Q'
+        assert R.dtype == torch.cdouble, f'Unexpected dtype {R.dtype} for R'
+        assert torch.equal(Q, Q_ref), 'Q not matching the reference'
+        assert torch.equal(R, R_ref), 'R not matching the reference'
+
+        # Single precision without accumulation cannot represent the reference
+        Q, R = estimate_correlations(WPEFilter(filter_length=filter_length, prediction_delay=delay), x, weight)
+        assert not torch.equal(Q.to(torch.cdouble), Q_ref), 'Q without accumulation is not expected to be exact'
+
+    @pytest.mark.unit
+    def test_mask_based_dereverb_accumulation_dtype_precision(self):
+        """Test that accumulation in lower precision than the signal is rejected.
+        """
+        with pytest.raises(ValueError):
+            MaskBasedDereverbWPE(
+                filter_length=5, prediction_delay=2, dtype=torch.cdouble, accumulation_dtype=torch.cfloat
+            )
+
+        wpe_filter = WPEFilter(filter_length=5, prediction_delay=2, accumulation_dtype=torch.cfloat)
+        x = torch.randn(2, 3, 15, 21, dtype=torch.cdouble)
+        tilde_x = wpe_filter.convtensor(x, filter_length=5, delay=2)
+        weight = torch.rand(2, 15, 21, dtype=torch.double)
+        with pytest.raises(RuntimeError):
+            wpe_filter.estimate_correlations(input=x, weight=weight, tilde_input=tilde_x)
+
+    @pytest.mark.unit
+    def test_wpe_filter_packed_input(self):
+        """Test that a packed convolution tensor without the input signal is rejected
+        for estimation of correlation matrices, and accepted for filtering.
+        """
+        batch_size, num_channels, num_subbands, num_frames = 2, 3, 15, 21
+        filter_length, delay = 5, 2
+
+        wpe_filter = WPEFilter(filter_length=filter_length, prediction_delay=delay)
+        x = torch.randn(batch_size, num_channels, num_subbands, num_frames, dtype=torch.cdouble)
+        weight = torch.rand(batch_size, num_subbands, num_frames, dtype=torch.double)
+        tilde_x = wpe_filter.convtensor(x, filter_length=filter_length, delay=delay)
+
+        # Packed without the input signal
+        packed = wpe_filter.pack_convtensor(tilde_input=tilde_x)
+        with pytest.raises(RuntimeError):
+            wpe_filter.estimate_correlations(input=x, weight=weight, tilde_input=packed)
+
+        # Packed with the input signal
+        packed_with_input = wpe_filter.pack_convtensor(tilde_input=tilde_x, input=x)
+        Q, R = wpe_filter.estimate_correlations(input=x, weight=weight, tilde_input=packed_with_input)
+        G = wpe_filter.estimate_filter(Q=Q, R=R)
+
+        # Filtering accepts both layouts
+        y = wpe_filter.apply_filter(filter=G, tilde_input=packed)
+        y_with_input = wpe_filter.apply_filter(filter=G, tilde_input=packed_with_input)
+        assert torch.allclose(y, y_with_input), 'Filtering output not matching for packed layouts'
+
 
 class TestMaskEstimator:
     @pytest.mark.unit
@@ -416,6 +631,97 @@ class TestMaskEstimator:
                             mask_length == spec_length
                         ), f'Output length mismatch: expected {spec_length}, got {mask_length}'
 
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_outputs', [1, 3])
+    def test_rnn_legacy_state_dict(self, num_outputs: int):
+        """Test loading a state dict with a separate projection layer for each output,
+        and processing a batch with all examples shorter than the input.
+        """
+        num_channels = 4
+        num_subbands = 33
+        batch_size = 3
+        num_frames = 50
+
+        model_config = dict(
+            num_outputs=num_outputs,
+            num_subbands=num_subbands,
+            num_features=32,
+            num_layers=2,
+            num_input_channels=num_channels,
+            use_ipd=True,
+        )
+
+        uut_ref = MaskEstimatorRNN(**model_config).eval()
+
+        # Legacy state dict with `output_projections.{m}` layers
+        state_dict = uut_ref.state_dict()
+        for name in ['weight', 'bias']:
+            projection = state_dict.pop(f'output_projection.{name}')
+            for m, projection_m in enumerate(projection.chunk(num_outputs, dim=0)):
+                state_dict[f'output_projections.{m}.{name}'] = projection_m
+
+        uut = MaskEstimatorRNN(**model_config).eval()
+        uut.load_state_dict(state_dict)
+
+        spec = torch.randn(batch_size, num_channels, num_subbands, num_frames, dtype=torch.cfloat)
+        # All examples are shorter than the input
+        spec_length = torch.tensor([num_frames - 10, num_frames - 15, num_frames - 20])
+
+        with torch.no_grad():
+            mask_ref, mask_length_ref = uut_ref(input=spec, input_length=spec_length)
+            mask, mask_length = uut(input=spec, input_length=spec_length)
+
+        expected_mask_shape = (batch_size, num_outputs, num_subbands, num_frames)
+        assert (
+            mask.shape == expected_mask_shape
+        ), f'Output shape mismatch: expected {expected_mask_shape}, got {mask.shape}'
+        assert torch.equal(
+            mask_length, spec_length
+        ), f'Output length mismatch: expected {spec_length}, got {mask_length}'
+        assert torch.equal(mask_length, mask_length_ref), 'Output length not matching the reference'
+        assert torch.allclose(mask, mask_ref), 'Output not matching the reference'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('autocast_dtype', [torch.float16, torch.bfloat16])
+    def test_rnn_autocast(self, autocast_dtype: torch.dtype):
+        """Test that the mask estimator with autocast matches the default path,
+        for batches with and without padding.
+        """
+        atol = 1e-2
+        num_outputs = 2
+        num_channels = 4
+        num_subbands = 33
+        batch_size = 3
+        num_frames = 50
+
+        model_config = dict(
+            num_outputs=num_outputs,
+            num_subbands=num_subbands,
+            num_features=32,
+            num_layers=2,
+            num_input_channels=num_channels,
+            use_ipd=True,
+        )
+
+        uut_ref = MaskEstimatorRNN(**model_config).eval()
+        uut = MaskEstimatorRNN(**model_config, autocast_dtype=autocast_dtype).eval()
+        uut.load_state_dict(uut_ref.state_dict())
+
+        spec = torch.randn(batch_size, num_channels, num_subbands, num_frames, dtype=torch.cfloat)
+
+        for spec_length in [
+            torch.tensor([num_frames] * batch_size),
+            torch.tensor([num_frames, num_frames - 10, num_frames - 20]),
+        ]:
+            with torch.no_grad():
+                mask_ref, mask_length_ref = uut_ref(input=spec, input_length=spec_length)
+                mask, mask_length = uut(input=spec, input_length=spec_length)
+
+            assert mask.shape == mask_ref.shape, f'Output shape mismatch: expected {mask_ref.shape}, got {mask.shape}'
+            assert mask.dtype == mask_ref.dtype, f'Output dtype mismatch: expected {mask_ref.dtype}, got {mask.dtype}'
+            assert torch.equal(mask_length, mask_length_ref), 'Output length not matching the reference'
+            assert torch.allclose(mask, mask_ref, atol=atol), f'Output not matching the reference for {spec_length}'
+
     @pytest.mark.unit
     @pytest.mark.parametrize('num_channels', [1, 4])
     @pytest.mark.parametrize('num_subbands', [32, 65])
@@ -448,3 +754,116 @@ class TestMaskEstimator:
         assert (
             mask.shape == expected_mask_shape
         ), f'Output shape mismatch: expected {expected_mask_shape}, got {mask.shape}'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_outputs', [2, 3])
+    @pytest.mark.parametrize('log_pdf_offset', [0, 25])
+    def test_gss_update_masks(self, num_outputs: int, log_pdf_offset: float):
+        """Test mask update of the GSS mask estimator against the reference
+        multiplicative formula, with partially inactive sources.
+        Inactive sources get a PDF offset to test large differences in the PDF across components.
+        """
+        atol = 1e-6
+        batch_size = 4
+        num_subbands = 17
+        num_frames = 50
+        num_examples = 10
+        random_seed = 42
+
+        _rng = np.random.default_rng(seed=random_seed)
+
+        uut = MaskEstimatorGSS()
+
+        for n in range(num_examples):
+            alpha = _rng.uniform(low=0.0, high=1.0, size=(batch_size, num_outputs, num_subbands))
+            # some components have zero weight
+            alpha[_rng.uniform(size=alpha.shape) < 0.1] = 0.0
+            activity = _rng.uniform(size=(batch_size, num_outputs, num_frames)) > 0.5
+            log_pdf = _rng.normal(scale=5, size=(batch_size, num_outputs, num_subbands, num_frames))
+            # inactive components have a higher PDF
+            log_pdf += log_pdf_offset * np.logical_not(activity[..., None, :])
+
+            # UUT
+            gamma = uut.update_masks(
+                alpha=torch.tensor(alpha, dtype=torch.float),
+                activity=torch.tensor(activity),
+                log_pdf=torch.tensor(log_pdf, dtype=torch.float),
+            )
+            gamma = gamma.cpu().detach().numpy()
+
+            # Golden
+            gamma_golden = alpha[..., None] * np.exp(log_pdf) * activity[..., None, :]
+            gamma_sum = np.sum(gamma_golden, axis=-3, keepdims=True)
+            gamma_golden = np.divide(gamma_golden, gamma_sum, out=np.zeros_like(gamma_golden), where=gamma_sum > 0)
+
+            assert gamma.shape == gamma_golden.shape, f'Output shape not matching for example {n}'
+            assert np.allclose(gamma, gamma_golden, atol=atol), f'Masks not matching for example {n}'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_channels', [4, 8])
+    @pytest.mark.parametrize('num_outputs', [2, 3])
+    @pytest.mark.parametrize('num_frames', [50, 300])
+    def test_gss_dtype(self, num_channels: int, num_outputs: int, num_frames: int):
+        """Test that GSS masks calculated in single precision match the masks
+        calculated in double precision, including a source which is active
+        in fewer frames than the number of channels, resulting in a rank-deficient shape matrix.
+        """
+        # EM iterations may amplify small differences in isolated time-frequency bins
+        atol = 1e-3
+        batch_size = 4
+        num_subbands = 17
+        num_examples = 5
+        random_seed = 42
+
+        _rng = np.random.default_rng(seed=random_seed)
+
+        uut_cfloat = MaskEstimatorGSS(dtype=torch.cfloat)
+        uut_cdouble = MaskEstimatorGSS(dtype=torch.cdouble)
+
+        for n in range(num_examples):
+            spec_size = (batch_size, num_channels, num_subbands, num_frames)
+            spec = _rng.normal(size=spec_size) + 1j * _rng.normal(size=spec_size)
+            activity = _rng.uniform(size=(batch_size, num_outputs, num_frames)) > 0.3
+            # last source active only in a few frames
+            activity[:, -1, :] = False
+            activity[:, -1, : num_channels // 2] = True
+
+            mask_cfloat = uut_cfloat(input=torch.tensor(spec), activity=torch.tensor(activity))
+            mask_cdouble = uut_cdouble(input=torch.tensor(spec), activity=torch.tensor(activity))
+
+            assert torch.allclose(
+                mask_cfloat.to(mask_cdouble.dtype), mask_cdouble, atol=atol
+            ), f'Masks not matching for example {n}'
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize('num_channels', [2, 4])
+    def test_gss_accumulate_shape_matrix(self, num_channels: int):
+        """Test that the shape matrix for single-precision input is accumulated in double precision.
+
+        The input has small integer values, so that partial sums over a single block of frames
+        are exact in single precision, while the sums over all frames are larger than 2**24
+        and cannot be represented exactly in single precision.
+        """
+        batch_size = 2
+        num_outputs = 2
+        num_subbands = 3
+        num_frames = 64 * MaskEstimatorGSS.accumulation_block_size
+
+        z_size = (batch_size, num_channels, num_subbands, num_frames)
+        z = torch.complex(torch.randint(0, 100, z_size).float(), torch.randint(0, 100, z_size).float())
+        scale = torch.ones(batch_size, num_outputs, num_subbands, num_frames)
+
+        uut = MaskEstimatorGSS()
+
+        # Reference in double precision
+        BM_ref = uut.accumulate_shape_matrix(scale=scale.double(), z=z.to(torch.cdouble))
+
+        # Single precision input with accumulation in double precision is exact
+        BM = uut.accumulate_shape_matrix(scale=scale, z=z)
+        assert BM.dtype == torch.cdouble, f'Unexpected dtype {BM.dtype}'
+        assert torch.equal(BM, BM_ref), 'Shape matrix not matching the reference'
+
+        # Summing all frames in a single block in single precision cannot represent the reference
+        uut.accumulation_block_size = num_frames
+        BM = uut.accumulate_shape_matrix(scale=scale, z=z)
+        assert not torch.equal(BM, BM_ref), 'Shape matrix without accumulation is not expected to be exact'